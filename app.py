@@ -1,11 +1,27 @@
 import collections
-import geopandas as gpd
+import folium
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+# geemap's package __init__ imports the ipyleaflet backend unless USE_FOLIUM is
+# set, and that shadows the basemaps module geemap.foliumap needs at import.
+os.environ.setdefault("USE_FOLIUM", "1")
+
 import geemap.foliumap as geemap
-import json
 import streamlit as st
-from streamlit_folium import folium_static
 import ee
+import io
 import pandas as pd
+import pyogrio
+import shapely
+
+from constants import (
+    bios_bands,
+    bios_names,
+    bios_symbols,
+    scale,
+    units,
+)
 
 
 collections.Callable = collections.abc.Callable
@@ -13,27 +29,88 @@ collections.Callable = collections.abc.Callable
 # st.set_page_config(layout="wide")
 
 
-@st.cache(allow_output_mutation=True)
-def uploaded_file_to_gdf(data):
-    import tempfile
-    import os
-    import uuid
+@st.cache_data(show_spinner=False)
+def uploaded_file_to_gdf(data_bytes):
+    gdf = pyogrio.read_dataframe(io.BytesIO(data_bytes))
 
-    _, file_extension = os.path.splitext(data.name)
-    file_id = str(uuid.uuid4())
-    file_path = os.path.join(tempfile.gettempdir(), f"{file_id}{file_extension}")
+    return gdf
 
-    with open(file_path, "wb") as file:
-        file.write(data.getbuffer())
 
-    if file_path.lower().endswith(".kml"):
-        gpd.io.file.fiona.drvsupport.supported_drivers["KML"] = "rw"
-        gdf = gpd.read_file(file_path, driver="KML")
-    else:
-        gdf = gpd.read_file(file_path)
+@st.cache_resource
+def initialize_ee():
+    geemap.ee_initialize(url="https://earthengine-highvolume.googleapis.com")
+    return True
+
+
+@st.cache_resource
+def build_map_html():
+    m = geemap.Map(
+        center=[-27.86, -50.20],
+        zoom=10,
+        basemap="HYBRID",
+        plugin_Draw=True,
+        Draw_export=True,
+        locate_control=True,
+        plugin_LatLngPopup=False,
+        ee_initialize=False,
+    )
+    return folium.Figure().add_child(m).render()
+
+
+@st.cache_resource
+def get_worldclim(asset_id):
+    return ee.Image(asset_id).select(bios_bands)
+
+
+def gdf_to_ee(gdf):
+    return ee.FeatureCollection(
+        [
+            ee.Feature(ee.Geometry.Point([x, y]))
+            for x, y in shapely.get_coordinates(gdf.geometry.values).tolist()
+        ]
+    )
 
-    return gdf
 
+def sample_in_chunks(gdf, dataset, chunk_size=50):
+    def sample(chunk):
+        roi = gdf_to_ee(chunk)
+        sampled = dataset.reduceRegions(
+            collection=roi,
+            reducer=ee.Reducer.first(),
+            tileScale=4,
+        ).select(bios_bands, retainGeometry=False)
+        return geemap.ee_to_df(sampled)
+
+    chunks = [gdf.iloc[i : i + chunk_size] for i in range(0, len(gdf), chunk_size)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        frames = list(executor.map(sample, chunks))
+    return pd.concat(frames, ignore_index=True)
+
+
+@st.cache_data(show_spinner=False)
+def extract_bio(geojson_bytes, asset_id):
+    gdf = uploaded_file_to_gdf(geojson_bytes)
+    dataset = get_worldclim(asset_id)
+    df = sample_in_chunks(gdf, dataset)
+    return df.reindex(columns=bios_bands)
+
+
+@st.cache_data
+def convert_df(df):
+    buf = io.BytesIO()
+    df.T.to_csv(buf, sep=";", decimal=",", encoding="utf-8")
+    return buf.getvalue()
+
+
+@st.cache_data
+def _bioclim_table():
+    return pd.DataFrame(
+        list(zip(bios_symbols, bios_names, units, scale)),
+        columns=["Nome", "Descrição", "Unidade", "Escala"],
+    ).set_index("Nome")
+
+
+initialize_ee()
 
 col1, col2 = st.columns([2, 3])
 
@@ -60,97 +137,6 @@ st.markdown(
 #    "A obtenção das mesmas pode ser util para estudos ecológicos, como, por exemplo, na modelagem de nicho ecológico de espécies e variação espacial de comunidades de espécies."
 # )
 
-bios_symbols = [
-    "BIO1",
-    "BIO2",
-    "BIO3",
-    "BIO4",
-    "BIO5",
-    "BIO6",
-    "BIO7",
-    "BIO8",
-    "BIO9",
-    "BIO10",
-    "BIO11",
-    "BIO12",
-    "BIO13",
-    "BIO14",
-    "BIO15",
-    "BIO16",
-    "BIO17",
-    "BIO18",
-    "BIO19",
-]
-bios_names = [
-    "Temperatura média anual",
-    "Média da amplitude da temperatura diurna",
-    "Isotermalidade",
-    "Sazonalidade da Temperatura",
-    "Temperatura máxima do mês mais quente",
-    "Temperatura mínima do mês mais frio",
-    "Amplitude da temperatura anual",
-    "Média da temperatura no trimestre mais úmido",
-    "Média da temperatura no trimestre mais seco",
-    "Média da temperatura no trimestre mais quente",
-    "Média da temperatura no trimestre mais frio",
-    "Precipitação anual",
-    "Precipitação no mês mais úmido",
-    "Precipitação no mês mais seco",
-    "Sazonalidade de precipitação",
-    "Precipitação no trimestre mais úmido",
-    "Precipitação no trimestre mais seco",
-    "Precipitação no trimestre mais quente",
-    "Precipitação no trimestre mais frio",
-]
-
-units = [
-    "°C",
-    "°C",
-    "%",
-    "°C",
-    "°C",
-    "°C",
-    "°C",
-    "°C",
-    "°C",
-    "°C",
-    "°C",
-    "mm",
-    "mm",
-    "mm",
-    "%",
-    "mm",
-    "mm",
-    "mm",
-    "mm",
-]
-
-scale = [
-    "0.1",
-    "0.1",
-    " ",
-    "0.01",
-    "0.1",
-    "0.1",
-    "0.1",
-    "0.1",
-    "0.1",
-    "0.1",
-    "0.1",
-    " ",
-    " ",
-    " ",
-    " ",
-    " ",
-    " ",
-    " ",
-    " ",
-]
-
-
-zipped = list(zip(bios_symbols, bios_names, units, scale))
-
-bioclim_df = pd.DataFrame(zipped, columns=["Nome", "Descrição", "Unidade", "Escala"])
 
 ##st.markdown("""---""")
 st.text(" ")
@@ -163,95 +149,108 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-m = geemap.Map(
-    center=[-27.86, -50.20],
-    zoom=10,
-    basemap="HYBRID",
-    plugin_Draw=True,
-    Draw_export=True,
-    locate_control=True,
-    plugin_LatLngPopup=False,
-)
-st.warning(
-    "Usar **apenas** a ferramenta 'Draw a marker', para selecionar os pontos de interesse e, em seguida, clicar em 'Export'."
-)
-folium_static(m, width=700, height=400)
-
-st.markdown("""---""")
-st.markdown(
-    "<h3>2) Upload do arquivo GeoJSON 📤</h3>",
-    unsafe_allow_html=True,
-)
-data = st.file_uploader(
-    "Fazer o upload do arquivo GeoJSON exportado no passo acima para utilizar como áreas de interesse 👇👇",
-    type=["geojson"],
-)
+if "step1_done" not in st.session_state:
+    st.warning(
+        "Usar **apenas** a ferramenta 'Draw a marker', para selecionar os pontos de interesse e, em seguida, clicar em 'Export'."
+    )
+    st.iframe(build_map_html(), width=700, height=410)
+    st.button(
+        "Confirmar pontos",
+        on_click=lambda: st.session_state.update(step1_done=True),
+    )
+else:
+    st.button(
+        "Mostrar mapa",
+        on_click=lambda: st.session_state.pop("step1_done"),
+    )
 
 st.markdown("""---""")
-
-st.markdown(
-    "<h3>3) Indicar a identificação das áreas #️⃣ </h3>",
-    unsafe_allow_html=True,
-)
-
-input_areas = st.text_area(
-    "Seguir a ordem indicada no mapa e separar por vírgula. Usar tecla 'tab' para confirmar",
-    height=50,
-)
-areas_list = input_areas.split(",")
-
-if input_areas:
-    gdf = uploaded_file_to_gdf(data)
-    pontos = {"latitude": gdf.geometry.y, "longitude": gdf.geometry.x}
-    pontos = pd.DataFrame(pontos)
-
-    gdf = gdf.to_json()
-    gdf = json.loads(gdf)
-    gdf = gdf["features"]
-
-    roi = ee.FeatureCollection(gdf)
-    dataset = ee.Image("WORLDCLIM/V1/BIO")
-    df = geemap.ee_to_pandas(geemap.extract_values_to_points(roi, dataset))
-
-    st.markdown("---")
-
-    df_final = pd.concat([pontos, df], axis=1)
-    df_final.index = areas_list
-    df_final = df_final.T
+with st.form("run_form"):
     st.markdown(
-        "<h3> Aqui estão suas variáveis bioclimáticas! 😀 </h3>",
+        "<h3>2) Upload do arquivo GeoJSON 📤</h3>",
         unsafe_allow_html=True,
     )
+    data = st.file_uploader(
+        "Fazer o upload do arquivo GeoJSON exportado no passo acima para utilizar como áreas de interesse 👇👇",
+        type=["geojson"],
+    )
 
-    df_final
+    st.markdown("""---""")
 
     st.markdown(
-        "<h3> 👇👇👇 clique para  o download</h3>",
+        "<h3>3) Indicar a identificação das áreas #️⃣ </h3>",
         unsafe_allow_html=True,
     )
 
-    def convert_df(df):
-        return df.to_csv(sep=";", decimal=",").encode("utf-8")
+    input_areas = st.text_area(
+        "Seguir a ordem indicada no mapa e separar por vírgula. Clicar em 'Processar' para confirmar",
+        height=50,
+    )
+    st.form_submit_button("Processar")
 
-    csv = convert_df(df_final)
+areas_list = input_areas.split(",")
 
-    st.download_button(
-        "Download CSV...",
-        csv,
-        "file.csv",
-        "text/csv",
-        key="download-csv",
-    )
-    st.markdown("---")
-    st.markdown(
-        "<h5>Detalhamento:</h5>",
-        unsafe_allow_html=True,
-    )
-    st.markdown(
-        "Para maiores informações, acessar o site do [worldclim](https://www.worldclim.org/)."
-    )
-    st.table(bioclim_df.set_index("Nome"))
-    st.caption("Resolução: 927,67 metros")
+if data and input_areas:
+    data_bytes = data.getvalue()
+    gdf = uploaded_file_to_gdf(data_bytes)
+    if gdf.empty:
+        st.error(
+            "O arquivo GeoJSON não contém pontos. Marcar os pontos no mapa antes de clicar em 'Export'."
+        )
+    elif not (gdf.geom_type == "Point").all():
+        st.error(
+            "O arquivo GeoJSON deve conter apenas pontos, criados com a ferramenta 'Draw a marker'."
+        )
+    elif len(areas_list) != len(gdf):
+        st.error(
+            f"Foram informadas {len(areas_list)} identificações para {len(gdf)} pontos. Informar uma identificação por ponto, separadas por vírgula."
+        )
+    else:
+        xy = shapely.get_coordinates(gdf.geometry.values)
+        df = extract_bio(data_bytes, "WORLDCLIM/V1/BIO")
+
+        st.markdown("---")
+
+        df_final = pd.concat(
+            [
+                pd.DataFrame(
+                    {"latitude": xy[:, 1], "longitude": xy[:, 0]}, index=areas_list
+                ),
+                df.set_axis(areas_list),
+            ],
+            axis=1,
+        )
+        st.markdown(
+            "<h3> Aqui estão suas variáveis bioclimáticas! 😀 </h3>",
+            unsafe_allow_html=True,
+        )
+
+        st.dataframe(df_final)
+
+        st.markdown(
+            "<h3> 👇👇👇 clique para  o download</h3>",
+            unsafe_allow_html=True,
+        )
+
+        csv = convert_df(df_final)
+
+        st.download_button(
+            "Download CSV...",
+            csv,
+            "file.csv",
+            "text/csv",
+            key="download-csv",
+        )
+        st.markdown("---")
+        st.markdown(
+            "<h5>Detalhamento:</h5>",
+            unsafe_allow_html=True,
+        )
+        st.markdown(
+            "Para maiores informações, acessar o site do [worldclim](https://www.worldclim.org/)."
+        )
+        st.table(_bioclim_table())
+        st.caption("Resolução: 927,67 metros")
 
 st.markdown("---")
 st.subheader("Referência")
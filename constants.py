@@ -0,0 +1,87 @@
+bios_symbols = (
+    "BIO1",
+    "BIO2",
+    "BIO3",
+    "BIO4",
+    "BIO5",
+    "BIO6",
+    "BIO7",
+    "BIO8",
+    "BIO9",
+    "BIO10",
+    "BIO11",
+    "BIO12",
+    "BIO13",
+    "BIO14",
+    "BIO15",
+    "BIO16",
+    "BIO17",
+    "BIO18",
+    "BIO19",
+)
+bios_bands = tuple(f"bio{i:02d}" for i in range(1, 20))
+bios_names = (
+    "Temperatura média anual",
+    "Média da amplitude da temperatura diurna",
+    "Isotermalidade",
+    "Sazonalidade da Temperatura",
+    "Temperatura máxima do mês mais quente",
+    "Temperatura mínima do mês mais frio",
+    "Amplitude da temperatura anual",
+    "Média da temperatura no trimestre mais úmido",
+    "Média da temperatura no trimestre mais seco",
+    "Média da temperatura no trimestre mais quente",
+    "Média da temperatura no trimestre mais frio",
+    "Precipitação anual",
+    "Precipitação no mês mais úmido",
+    "Precipitação no mês mais seco",
+    "Sazonalidade de precipitação",
+    "Precipitação no trimestre mais úmido",
+    "Precipitação no trimestre mais seco",
+    "Precipitação no trimestre mais quente",
+    "Precipitação no trimestre mais frio",
+)
+
+units = (
+    "°C",
+    "°C",
+    "%",
+    "°C",
+    "°C",
+    "°C",
+    "°C",
+    "°C",
+    "°C",
+    "°C",
+    "°C",
+    "mm",
+    "mm",
+    "mm",
+    "%",
+    "mm",
+    "mm",
+    "mm",
+    "mm",
+)
+
+scale = (
+    "0.1",
+    "0.1",
+    " ",
+    "0.01",
+    "0.1",
+    "0.1",
+    "0.1",
+    "0.1",
+    "0.1",
+    "0.1",
+    "0.1",
+    " ",
+    " ",
+    " ",
+    " ",
+    " ",
+    " ",
+    " ",
+    " ",
+)